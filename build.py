@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Build a standalone stash_to_nfo executable with Nuitka.
+
+The compiled CLI starts without a Python installation and skips loading
+the interpreter's standard library from .pyc files, which suits running
+it once per file from scripts. Requires Nuitka and a C compiler:
+
+    python -m pip install nuitka
+    python build.py
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+# Project modules imported lazily by the CLI, which must be compiled in
+_MODULES = ["parsers", "converters", "nfo_generator", "stash_api"]
+
+
+def main():
+    """Run Nuitka on stash_to_nfo.py."""
+    parser = argparse.ArgumentParser(description="Build a standalone stash_to_nfo executable with Nuitka")
+    
+    parser.add_argument(
+        "--onefile",
+        action="store_true",
+        help="Pack everything into a single file (unpacks itself on every run, so it starts slower)"
+    )
+    
+    parser.add_argument(
+        "--output-dir",
+        default="build",
+        help="Directory for the build output (default: build)"
+    )
+    
+    args = parser.parse_args()
+    
+    root = Path(__file__).resolve().parent
+    command = [
+        sys.executable, "-m", "nuitka",
+        "--onefile" if args.onefile else "--standalone",
+        "--assume-yes-for-downloads",
+        f"--output-dir={args.output_dir}",
+        "--output-filename=stash_to_nfo",
+        *[f"--include-module={module}" for module in _MODULES],
+        str(root / "stash_to_nfo.py"),
+    ]
+    
+    print(" ".join(command))
+    sys.exit(subprocess.call(command, cwd=root))
+
+
+if __name__ == "__main__":
+    main()
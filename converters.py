@@ -2,50 +2,182 @@
 Converters for transforming StashApp data to NFO format.
 """
 
-import base64
-from datetime import datetime
-from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+import functools
+import re
+from datetime import date, datetime
+from typing import (TYPE_CHECKING, Dict, Any, Iterable, List, Optional, Tuple,
+                    Union)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Date formats accepted by _normalize_date_cached, tried in order. Timestamps
+# such as 2023-12-25T10:30:00 are matched on their date part.
+_DATE_FORMATS = (
+    '%Y-%m-%d',  # 2023-12-25
+    '%d/%m/%Y',  # 25/12/2023
+    '%m/%d/%Y',  # 12/25/2023
+    '%d-%m-%Y',  # 25-12-2023
+    '%m-%d-%Y',  # 12-25-2023
+)
+
+# Performer fields listed in the biography, as (key, label) in display order
+_BIO_FIELDS = (
+    ('gender', 'Gender'),
+    ('ethnicity', 'Ethnicity'),
+    ('country', 'Country'),
+    ('height', 'Height'),
+    ('measurements', 'Measurements'),
+    ('eye_color', 'Eye Color'),
+    ('career_length', 'Career Length'),
+    ('tattoos', 'Tattoos'),
+    ('piercings', 'Piercings'),
+)
+
+# Every performer key that can contribute to the biography
+_BIO_KEYS = frozenset(key for key, _ in _BIO_FIELDS) | {'aliases'}
+
+# Fixed part of the unique ID emitted for scenes and galleries
+_UID_TEMPLATE = {'type': 'stash', 'default': True}
+
+# Leading bytes of supported image formats, mapped to file extensions
+_IMAGE_MAGIC = {
+    b'\xff\xd8\xff': 'jpg',
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'GIF87a': 'gif',
+    b'GIF89a': 'gif',
+    b'BM': 'bmp',
+}
+
+# Bytes of image header needed to detect its format (WEBP checks bytes 8-12)
+_IMAGE_HEADER_SIZE = 12
+
+# Base64 characters decoded per write when extracting images (multiple of 4)
+_BASE64_CHUNK_SIZE = 4 * 65536
+
+# ASCII whitespace that may wrap base64 image data
+_BASE64_WHITESPACE = ('\n', '\r', ' ', '\t', '\v', '\f')
+
+# Bound once to skip the attribute lookup in the date format loop
+_strptime = datetime.strptime
+
+# StashApp's own YYYY-MM-DD layout, optionally followed by a time part
+_ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:T|\Z)', re.ASCII)
+
+
+def _match_iso_date(date_str: str) -> Optional[re.Match]:
+    """Match a valid YYYY-MM-DD date, optionally followed by a time part."""
+    match = _ISO_DATE_RE.match(date_str)
+    if match:
+        try:
+            date(*map(int, match.groups()))
+            return match
+        except ValueError:
+            pass
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_date_cached(date_str: str) -> Optional[str]:
+    """
+    Normalize a date string to NFO format (YYYY-MM-DD).
+
+    Results are cached, since bulk conversions see the same dates repeatedly.
+
+    Args:
+        date_str: Date string in various formats
+
+    Returns:
+        Date string in YYYY-MM-DD format, or None if no format matches
+    """
+    # Fast path for ISO dates, skipping strptime entirely
+    match = _match_iso_date(date_str)
+    if match:
+        return '-'.join(match.groups())
+
+    # Only the date part matters; any time suffix is dropped up front
+    head = date_str.split('T', 1)[0]
+
+    for fmt in _DATE_FORMATS:
+        try:
+            dt = _strptime(head, fmt)
+        except ValueError:
+            continue
+        return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+
+    return None
 
 
 class StashToNfoConverter:
     """Converts StashApp JSON data to NFO-compatible format."""
+
+    __slots__ = ('extracted_images', '_trust')
     
-    def __init__(self):
-        """Initialize the converter."""
+    def __init__(self, trust_schema: bool = False):
+        """
+        Initialize the converter.
+        
+        Args:
+            trust_schema: Skip type checks on list/dict fields, for input
+                already validated against the StashApp schema
+        """
         self.extracted_images: List[Dict[str, Union[str, int]]] = []
+        self._trust = trust_schema
 
     def convert(self, stash_data: Dict[str, Any],
-                data_type: str) -> Dict[str, Any]:
+                data_type: str, fresh: bool = False) -> Dict[str, Any]:
         """
         Convert StashApp data to NFO format.
         
         Args:
             stash_data: Parsed StashApp JSON data
             data_type: Type of data ('scene', 'performer', 'gallery')
+            fresh: Clear the cached date conversions before converting
             
         Returns:
             NFO-compatible data structure
         """
-        if data_type == 'scene':
-            return self._convert_scene(stash_data)
-        elif data_type == 'performer':
-            return self._convert_performer(stash_data)
-        elif data_type == 'gallery':
-            return self._convert_gallery(stash_data)
-        else:
-            raise ValueError(f"Unsupported data type: {data_type}")
+        if fresh:
+            _normalize_date_cached.cache_clear()
+
+        try:
+            convert_func = self._DISPATCH[data_type]
+        except KeyError:
+            raise ValueError(f"Unsupported data type: {data_type}") from None
+
+        return convert_func(self, stash_data)
+
+    def convert_many(self, records: Iterable[Tuple[Dict[str, Any], str]]
+                     ) -> List[Dict[str, Any]]:
+        """
+        Convert a batch of StashApp records to NFO format.
+        
+        Args:
+            records: (stash_data, data_type) pairs, as accepted by convert()
+            
+        Returns:
+            NFO-compatible data structures, in the same order as records
+        """
+        # Local lookups keep attribute access out of the loop
+        dispatch = self._DISPATCH
+        results = []
+        append = results.append
+
+        for stash_data, data_type in records:
+            try:
+                convert_func = dispatch[data_type]
+            except KeyError:
+                raise ValueError(f"Unsupported data type: {data_type}") from None
+            append(convert_func(self, stash_data))
+
+        return results
 
     def _convert_scene(self, scene_data: Dict[str, Any]) -> Dict[str, Any]:
         """Convert StashApp scene data to movie NFO format."""
-        nfo_data = {}
+        nfo_data = self._convert_movie_common(scene_data)
 
-        # Basic metadata
-        nfo_data['title'] = scene_data.get('title', '')
-        nfo_data['originaltitle'] = scene_data.get('title', '')
         # Optional short tagline/one-liner from scene data
         nfo_data['tagline'] = scene_data.get('tagline', '')
-        nfo_data['plot'] = scene_data.get('details', '')
 
         # Rating (convert from StashApp rating to 0-10 scale)
         rating = scene_data.get('rating')
@@ -58,41 +190,9 @@ class StashToNfoConverter:
         else:
             nfo_data['userrating'] = 0
 
-        # Date handling
-        date_str = scene_data.get('date')
-        if date_str:
-            nfo_data['premiered'] = self._convert_date(date_str)
-            try:
-                year = datetime.strptime(date_str, '%Y-%m-%d').year
-                nfo_data['year'] = year
-            except (ValueError, TypeError):
-                pass
-
-        # Studio
-        nfo_data['studio'] = scene_data.get('studio', '')
-
-        # URL as unique ID
-        url = scene_data.get('url')
-        if url:
-            nfo_data['uniqueid'] = {
-                'type': 'stash',
-                'value': url,
-                'default': True
-            }
-
-        # Genres from tags
-        tags = scene_data.get('tags', [])
-        if isinstance(tags, list):
-            nfo_data['genres'] = tags
-
-        # Performers as actors
-        performers = scene_data.get('performers', [])
-        if isinstance(performers, list):
-            nfo_data['actors'] = self._convert_performers_to_actors(performers)
-
         # File information for runtime
         file_info = scene_data.get('file', {})
-        if isinstance(file_info, dict):
+        if self._trust or isinstance(file_info, dict):
             duration = file_info.get('duration')
             if duration:
                 try:
@@ -141,48 +241,58 @@ class StashToNfoConverter:
 
     def _convert_gallery(self, gallery_data: Dict[str, Any]) -> Dict[str, Any]:
         """Convert StashApp gallery data to NFO format (treated as movie)."""
+        nfo_data = self._convert_movie_common(gallery_data)
+
+        # Mark as gallery type
+        nfo_data['media_type'] = 'gallery'
+
+        return nfo_data
+
+    # Conversion method for each supported data type, used by convert()
+    _DISPATCH = {
+        'scene': _convert_scene,
+        'performer': _convert_performer,
+        'gallery': _convert_gallery,
+    }
+
+    def _convert_movie_common(self, src: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert metadata shared by scenes and galleries to movie NFO format."""
         nfo_data = {}
 
         # Basic metadata
-        nfo_data['title'] = gallery_data.get('title', '')
-        nfo_data['originaltitle'] = gallery_data.get('title', '')
-        nfo_data['plot'] = gallery_data.get('details', '')
+        nfo_data['title'] = title = src.get('title', '')
+        nfo_data['originaltitle'] = title
+        nfo_data['plot'] = src.get('details', '')
 
         # Date handling
-        date_str = gallery_data.get('date')
+        date_str = src.get('date')
         if date_str:
-            nfo_data['premiered'] = self._convert_date(date_str)
-            try:
-                year = datetime.strptime(date_str, '%Y-%m-%d').year
-                nfo_data['year'] = year
-            except (ValueError, TypeError):
-                pass
+            premiered = _normalize_date_cached(date_str)
+            if premiered:
+                nfo_data['premiered'] = premiered
+                # Normalized dates are always YYYY-MM-DD
+                nfo_data['year'] = int(premiered[:4])
+            else:
+                nfo_data['premiered'] = date_str
 
         # Studio
-        nfo_data['studio'] = gallery_data.get('studio', '')
+        nfo_data['studio'] = src.get('studio', '')
 
         # URL as unique ID
-        url = gallery_data.get('url')
+        url = src.get('url')
         if url:
-            nfo_data['uniqueid'] = {
-                'type': 'stash',
-                'value': url,
-                'default': True
-            }
+            nfo_data['uniqueid'] = {**_UID_TEMPLATE, 'value': url}
 
         # Genres from tags
-        tags = gallery_data.get('tags', [])
-        if isinstance(tags, list):
+        tags = src.get('tags', [])
+        if self._trust or isinstance(tags, list):
             nfo_data['genres'] = tags
 
         # Performers as actors
-        performers = gallery_data.get('performers', [])
-        if isinstance(performers, list):
+        performers = src.get('performers', [])
+        if self._trust or isinstance(performers, list):
             nfo_data['actors'] = self._convert_performers_to_actors(performers)
 
-        # Mark as gallery type
-        nfo_data['media_type'] = 'gallery'
-
         return nfo_data
 
     def _convert_performers_to_actors(
@@ -190,22 +300,25 @@ class StashToNfoConverter:
                                          Dict[str,
                                               Any]]]) -> List[Dict[str, Any]]:
         """Convert performers list to actors format for NFO."""
-        actors = []
+        # Sized up front; unusable entries are trimmed off the end afterwards
+        actors: List[Any] = [None] * len(performers)
+        count = 0
 
         for i, performer in enumerate(performers):
-            actor: Dict[str, Any] = {'order': i}
-
-            if isinstance(performer, str):
-                actor['name'] = performer
-                actor['role'] = ''
-            elif isinstance(performer, dict):
-                actor['name'] = performer.get('name', '')
-                actor['role'] = performer.get('role', '')
-            else:
-                continue
-
-            actors.append(actor)
-
+            # Performers are usually dicts; plain name strings are the fallback
+            try:
+                actors[count] = {
+                    'order': i,
+                    'name': performer.get('name', ''),
+                    'role': performer.get('role', '')
+                }
+            except AttributeError:
+                if not isinstance(performer, str):
+                    continue
+                actors[count] = {'order': i, 'name': performer, 'role': ''}
+            count += 1
+
+        del actors[count:]
         return actors
 
     def _convert_date(self, date_str: str) -> str:
@@ -221,73 +334,17 @@ class StashToNfoConverter:
         if not date_str:
             return ''
 
-        # Common date formats to try
-        date_formats = [
-            '%Y-%m-%d',  # 2023-12-25
-            '%Y-%m-%dT%H:%M:%S',  # 2023-12-25T10:30:00
-            '%Y-%m-%dT%H:%M:%S%z',  # 2023-12-25T10:30:00Z
-            '%d/%m/%Y',  # 25/12/2023
-            '%m/%d/%Y',  # 12/25/2023
-            '%d-%m-%Y',  # 25-12-2023
-            '%m-%d-%Y',  # 12-25-2023
-        ]
-
-        for fmt in date_formats:
-            try:
-                dt = datetime.strptime(
-                    date_str.split('T')[0],
-                    fmt.split('T')[0])
-                return dt.strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-
         # If no format matches, return original string
-        return date_str
+        return _normalize_date_cached(date_str) or date_str
 
     def _build_performer_biography(self, performer_data: Dict[str,
                                                               Any]) -> str:
         """Build a biography string from performer data."""
-        bio_parts = []
-
-        # Basic information
-        gender = performer_data.get('gender')
-        if gender:
-            bio_parts.append(f"Gender: {gender}")
-
-        ethnicity = performer_data.get('ethnicity')
-        if ethnicity:
-            bio_parts.append(f"Ethnicity: {ethnicity}")
-
-        country = performer_data.get('country')
-        if country:
-            bio_parts.append(f"Country: {country}")
-
-        # Physical attributes
-        height = performer_data.get('height')
-        if height:
-            bio_parts.append(f"Height: {height}")
-
-        measurements = performer_data.get('measurements')
-        if measurements:
-            bio_parts.append(f"Measurements: {measurements}")
-
-        eye_color = performer_data.get('eye_color')
-        if eye_color:
-            bio_parts.append(f"Eye Color: {eye_color}")
-
-        # Career information
-        career_length = performer_data.get('career_length')
-        if career_length:
-            bio_parts.append(f"Career Length: {career_length}")
-
-        # Body modifications
-        tattoos = performer_data.get('tattoos')
-        if tattoos:
-            bio_parts.append(f"Tattoos: {tattoos}")
+        if _BIO_KEYS.isdisjoint(performer_data):
+            return ''
 
-        piercings = performer_data.get('piercings')
-        if piercings:
-            bio_parts.append(f"Piercings: {piercings}")
+        bio_parts = [f"{label}: {value}" for key, label in _BIO_FIELDS
+                     if (value := performer_data.get(key))]
 
         # Aliases
         aliases = performer_data.get('aliases', [])
@@ -296,19 +353,21 @@ class StashToNfoConverter:
 
         return '\n'.join(bio_parts)
     
-    def extract_images(self, stash_data: Dict[str, Any], output_path: Path) -> List[str]:
+    def extract_images(self, stash_data: Dict[str, Any], output_path: 'Path',
+                       shared_dir: bool = False) -> List[str]:
         """
         Extract and save base64 encoded images from StashApp data.
         
         Args:
             stash_data: Parsed StashApp JSON data
             output_path: Path for the output NFO file (used to determine image save location)
+            shared_dir: Other NFOs are written to the same directory, so name
+                poster and fanart after the NFO too (<name>-poster.jpg)
             
         Returns:
             List of saved image filenames
         """
-        self.extracted_images.clear()
-        saved_images = []
+        saved_images: List[Tuple[str, str, int]] = []
         
         # Define possible image fields in StashApp data
         image_fields = {
@@ -326,13 +385,21 @@ class StashToNfoConverter:
             if field_name in stash_data:
                 image_data = stash_data[field_name]
                 if isinstance(image_data, str) and image_data:
-                    saved_file = self._save_base64_image(image_data, output_dir, base_name, image_type)
-                    if saved_file:
-                        saved_images.append(saved_file)
+                    saved = self._save_base64_image(image_data, output_dir, base_name,
+                                                    image_type, shared_dir)
+                    if saved:
+                        saved_images.append((image_type, *saved))
+        
+        # Store extraction info
+        self.extracted_images = [
+            {'type': image_type, 'filename': filename, 'size': size}
+            for image_type, filename, size in saved_images
+        ]
         
-        return saved_images
+        return [filename for _, filename, _ in saved_images]
     
-    def _save_base64_image(self, image_data: str, output_dir: Path, base_name: str, image_type: str) -> Optional[str]:
+    def _save_base64_image(self, image_data: str, output_dir: 'Path', base_name: str,
+                           image_type: str, shared_dir: bool = False) -> Optional[Tuple[str, int]]:
         """
         Save a base64 encoded image to disk.
         
@@ -341,43 +408,52 @@ class StashToNfoConverter:
             output_dir: Directory to save the image
             base_name: Base filename (without extension)
             image_type: Type of image (poster, thumb, fanart)
+            shared_dir: Prefix poster and fanart with base_name as well
             
         Returns:
-            Filename of saved image, or None if save failed
+            Tuple of (filename, size in bytes) of the saved image, or None if
+            save failed
         """
+        # Only needed once images are actually extracted
+        import binascii
+
         try:
             # Remove data URL prefix if present (e.g., "data:image/jpeg;base64,")
             if image_data.startswith('data:'):
-                image_data = image_data.split(',', 1)[1]
+                image_data = image_data.partition(',')[2]
             
-            # Decode base64 data
-            image_bytes = base64.b64decode(image_data)
+            # Chunks must stay aligned to 4 characters, so drop any line
+            # wrapping; unwrapped data (the usual case) isn't copied
+            if any(c in image_data for c in _BASE64_WHITESPACE):
+                image_data = ''.join(image_data.split())
             
-            # Detect image format from header
-            image_format = self._detect_image_format(image_bytes)
+            # Detect image format from just the header (4 characters per 3 bytes)
+            image_format = self._detect_image_format(
+                binascii.a2b_base64(image_data[:_IMAGE_HEADER_SIZE * 4 // 3]))
             if not image_format:
                 return None
             
             # Create filename
-            if image_type in ['poster', 'fanart']:
+            if image_type in ['poster', 'fanart'] and not shared_dir:
                 filename = f"{image_type}.{image_format}"
             else:
                 filename = f"{base_name}-{image_type}.{image_format}"
             
             image_path = output_dir / filename
             
-            # Save image file
-            with open(image_path, 'wb') as f:
-                f.write(image_bytes)
-            
-            # Store extraction info
-            self.extracted_images.append({
-                'type': image_type,
-                'filename': filename,
-                'size': len(image_bytes)
-            })
+            # Decode and save in chunks so the whole image is never held in memory
+            size = 0
+            try:
+                with open(image_path, 'wb') as f:
+                    for start in range(0, len(image_data), _BASE64_CHUNK_SIZE):
+                        size += f.write(binascii.a2b_base64(
+                            image_data[start:start + _BASE64_CHUNK_SIZE]))
+            except binascii.Error:
+                # Don't leave a truncated image behind
+                image_path.unlink(missing_ok=True)
+                raise
             
-            return filename
+            return filename, size
             
         except Exception as e:
             # Silently skip failed image extractions
@@ -397,16 +473,13 @@ class StashToNfoConverter:
             return None
         
         # Check common image format headers
-        if image_bytes.startswith(b'\xff\xd8\xff'):
-            return 'jpg'
-        elif image_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
-            return 'png'
-        elif image_bytes.startswith(b'GIF87a') or image_bytes.startswith(b'GIF89a'):
-            return 'gif'
-        elif image_bytes.startswith(b'RIFF') and b'WEBP' in image_bytes[:12]:
+        for magic, extension in _IMAGE_MAGIC.items():
+            if image_bytes.startswith(magic):
+                return extension
+
+        # WEBP is a RIFF container with its signature after the size field
+        if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
             return 'webp'
-        elif image_bytes.startswith(b'BM'):
-            return 'bmp'
         
         # Default to jpg if unknown
         return 'jpg'
@@ -2,24 +2,88 @@
 NFO XML file generator for Kodi/Jellyfin compatibility.
 """
 
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Any, List, Optional, Union
 import xml.etree.ElementTree as ET
-from typing import Dict, Any, List, Optional
-from xml.dom import minidom
+from xml.sax.saxutils import escape
+
+# Extra escapes for attribute values, matching ElementTree's serializer
+_ATTR_ENTITIES = {'"': '&quot;', '\r': '&#13;', '\n': '&#10;', '\t': '&#09;'}
+
+# Characters XML 1.0 can't hold, which ElementTree would write out as an
+# unparseable document
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+# Windows-only flag that stops os.write translating newlines (as tempfile
+# does); 0 elsewhere
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+
+# Names, studios and tags repeat within and across documents, so escape
+# each distinct string only once
+_escape = lru_cache(maxsize=1024)(escape)
+
+
+def _clean_text(text: str) -> str:
+    """Drop characters XML can't hold from a string."""
+    return _XML_INVALID.sub('', text)
+
+
+def _clean_data(value: Any) -> Any:
+    """Apply _clean_text to every string in converted NFO data."""
+    if type(value) is str:
+        return _clean_text(value)
+    if isinstance(value, dict):
+        return {key: _clean_data(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clean_data(item) for item in value]
+    return value
+
+
+def _is_clean(root: ET.Element) -> bool:
+    """Whether no text or attribute in a tree needs _clean_text."""
+    search = _XML_INVALID.search
+    for elem in root.iter():
+        text = elem.text
+        if text and search(text):
+            return False
+        if elem.attrib and any(search(value) for value in elem.attrib.values()):
+            return False
+    return True
+
+
+def _write_bytes(path: Union[str, Path], data: bytes) -> int:
+    """Write an already-encoded document with raw os.write calls."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return len(data)
 
 
 class NfoGenerator:
     """Generates NFO XML files from converted data."""
     
-    def __init__(self, encoding: str = 'utf-8', pretty_print: bool = True):
+    def __init__(self, encoding: str = 'utf-8', pretty_print: bool = False):
         """
         Initialize the NFO generator.
         
         Args:
             encoding: XML encoding (default: utf-8)
-            pretty_print: Whether to format XML with indentation
+            pretty_print: Whether to format XML with indentation (default: False)
         """
         self.encoding = encoding
         self.pretty_print = pretty_print
+        
+        # XML declaration that starts every document, built once
+        self._decl = f'<?xml version="1.0" encoding="{encoding}" standalone="yes" ?>'
+        if pretty_print:
+            self._decl += '\n'
     
     def generate(self, nfo_data: Dict[str, Any], data_type: str) -> str:
         """
@@ -32,138 +96,306 @@ class NfoGenerator:
         Returns:
             XML string in NFO format
         """
+        if not self.pretty_print and data_type in ['scene', 'gallery']:
+            return self._fast_movie_nfo(nfo_data)
+        return self._format_xml(self._build_tree(nfo_data, data_type))
+    
+    def generate_to_file(self, nfo_data: Dict[str, Any], data_type: str,
+                         path: Union[str, Path]) -> int:
+        """
+        Generate NFO XML and write it straight to a file.
+        
+        The document matches generate(), encoded with the generator's
+        encoding. Documents built as a single string are written with one
+        os.write; the rest are streamed with generate_to_stream().
+        
+        Args:
+            nfo_data: Converted NFO data structure
+            data_type: Type of data ('scene', 'performer', 'gallery')
+            path: Output NFO file path
+            
+        Returns:
+            Size of the written file in bytes
+        """
+        if self._builds_string(data_type):
+            return _write_bytes(path, self.generate(nfo_data, data_type).encode(
+                self.encoding, 'xmlcharrefreplace'))
+        
+        with open(path, 'wb') as f:
+            self.generate_to_stream(nfo_data, data_type, f)
+            return f.tell()
+    
+    def generate_to_stream(self, nfo_data: Dict[str, Any], data_type: str,
+                           stream: BinaryIO) -> None:
+        """
+        Generate NFO XML and write it to a binary file object.
+        
+        The document matches generate(), encoded with the generator's
+        encoding. Tree-built documents are serialized into the stream piece
+        by piece rather than as one string.
+        
+        Args:
+            nfo_data: Converted NFO data structure
+            data_type: Type of data ('scene', 'performer', 'gallery')
+            stream: Writable binary file object
+        """
+        if self._builds_string(data_type):
+            stream.write(self.generate(nfo_data, data_type).encode(
+                self.encoding, 'xmlcharrefreplace'))
+            return
+        
+        root = self._build_tree(nfo_data, data_type)
+        
+        stream.write(self._decl.encode(self.encoding))
+        if self.pretty_print:
+            ET.indent(root, space='  ')
+        ET.ElementTree(root).write(stream, encoding=self.encoding,
+                                   xml_declaration=False)
+    
+    def _builds_string(self, data_type: str) -> bool:
+        """
+        Whether generate() output is produced as one string anyway.
+        
+        True for the compact movie path.
+        """
+        return not self.pretty_print and data_type in ['scene', 'gallery']
+    
+    def _build_tree(self, nfo_data: Dict[str, Any], data_type: str) -> ET.Element:
+        """
+        Build the NFO XML tree for the given data type.
+        
+        Like _fast_movie_nfo(), text needing _clean_text is looked for in
+        the result, which is only then rebuilt from cleaned data.
+        """
         if data_type in ['scene', 'gallery']:
-            return self._generate_movie_nfo(nfo_data)
+            build = self._generate_movie_nfo
         elif data_type == 'performer':
-            return self._generate_actor_nfo(nfo_data)
+            build = self._generate_actor_nfo
         else:
             raise ValueError(f"Unsupported data type: {data_type}")
+        
+        root = build(nfo_data)
+        if not _is_clean(root):
+            root = build(_clean_data(nfo_data))
+        return root
     
-    def _generate_movie_nfo(self, nfo_data: Dict[str, Any]) -> str:
-        """Generate movie NFO XML."""
+    def _generate_movie_nfo(self, nfo_data: Dict[str, Any]) -> ET.Element:
+        """Generate movie NFO XML tree."""
+        # Local alias; element creation dominates building large trees
+        SubElement = ET.SubElement
+        g = nfo_data.get
         root = ET.Element('movie')
         
         # Basic metadata
-        self._add_text_element(root, 'title', nfo_data.get('title', ''))
-        self._add_text_element(root, 'originaltitle', nfo_data.get('originaltitle', ''))
+        SubElement(root, 'title').text = g('title', '') or ''
+        SubElement(root, 'originaltitle').text = g('originaltitle', '') or ''
         # Optional tagline (short one-line description)
-        self._add_text_element(root, 'tagline', nfo_data.get('tagline', ''))
-        self._add_text_element(root, 'plot', nfo_data.get('plot', ''))
+        SubElement(root, 'tagline').text = g('tagline', '') or ''
+        SubElement(root, 'plot').text = g('plot', '') or ''
         
         # Rating
-        userrating = nfo_data.get('userrating', 0)
-        self._add_text_element(root, 'userrating', str(userrating))
+        userrating = g('userrating', 0)
+        SubElement(root, 'userrating').text = str(userrating)
         
         # Date information
-        premiered = nfo_data.get('premiered')
+        premiered = g('premiered')
         if premiered:
-            self._add_text_element(root, 'premiered', premiered)
+            SubElement(root, 'premiered').text = premiered
         
-        year = nfo_data.get('year')
+        year = g('year')
         if year:
-            self._add_text_element(root, 'year', str(year))
+            SubElement(root, 'year').text = str(year)
         
         # Studio
-        studio = nfo_data.get('studio')
+        studio = g('studio')
         if studio:
-            self._add_text_element(root, 'studio', studio)
+            SubElement(root, 'studio').text = studio
         
         # Runtime
-        runtime = nfo_data.get('runtime')
+        runtime = g('runtime')
         if runtime:
-            self._add_text_element(root, 'runtime', str(runtime))
+            SubElement(root, 'runtime').text = str(runtime)
         
         # Unique ID
-        uniqueid_data = nfo_data.get('uniqueid')
-        if uniqueid_data and isinstance(uniqueid_data, dict):
-            uniqueid_elem = ET.SubElement(root, 'uniqueid')
-            uniqueid_elem.set('type', uniqueid_data.get('type', 'stash'))
-            if uniqueid_data.get('default'):
-                uniqueid_elem.set('default', 'true')
-            uniqueid_elem.text = uniqueid_data.get('value', '')
-        
-        # Genres
-        genres = nfo_data.get('genres', [])
-        for genre in genres:
-            if genre:  # Skip empty genres
-                self._add_text_element(root, 'genre', genre)
+        uniqueid_data = g('uniqueid')
+        if uniqueid_data:
+            try:
+                uid = uniqueid_data.get
+            except AttributeError:  # Not a mapping; nothing to write
+                pass
+            else:
+                uniqueid_elem = SubElement(root, 'uniqueid')
+                uniqueid_elem.set('type', uid('type', 'stash'))
+                if uid('default'):
+                    uniqueid_elem.set('default', 'true')
+                uniqueid_elem.text = uid('value', '')
         
-        # Tags (same as genres for NFO format)
-        for genre in genres:
-            if genre:
-                self._add_text_element(root, 'tag', genre)
+        # Genres, plus tags (same as genres for NFO format) in one pass; tags
+        # are held back so they still follow all of the genres
+        tag_elems = []
+        for genre in g('genres', []):
+            if not genre:  # Skip empty genres
+                continue
+            SubElement(root, 'genre').text = genre
+            tag_elem = ET.Element('tag')
+            tag_elem.text = genre
+            tag_elems.append(tag_elem)
+        root.extend(tag_elems)
         
         # Actors
-        actors = nfo_data.get('actors', [])
+        actors = g('actors', [])
         for actor_data in actors:
             if isinstance(actor_data, dict):
-                actor_elem = ET.SubElement(root, 'actor')
+                actor_elem = SubElement(root, 'actor')
                 
                 name = actor_data.get('name', '')
                 if name:
-                    self._add_text_element(actor_elem, 'name', name)
+                    SubElement(actor_elem, 'name').text = name
                 
                 role = actor_data.get('role', '')
                 if role:
-                    self._add_text_element(actor_elem, 'role', role)
+                    SubElement(actor_elem, 'role').text = role
                 
                 order = actor_data.get('order')
                 if order is not None:
-                    self._add_text_element(actor_elem, 'order', str(order))
+                    SubElement(actor_elem, 'order').text = str(order)
         
-        return self._format_xml(root)
+        return root
     
-    def _generate_actor_nfo(self, nfo_data: Dict[str, Any]) -> str:
-        """Generate actor/performer NFO XML."""
+    def _fast_movie_nfo(self, nfo_data: Dict[str, Any]) -> str:
+        """
+        Generate compact movie NFO XML by direct string assembly.
+        
+        Emits the same document as serializing _generate_movie_nfo() with
+        ElementTree, without building or walking a tree. Text that needs
+        _clean_text is found in the finished document, which is then
+        rebuilt from cleaned data, so clean input isn't copied first.
+        """
+        g = nfo_data.get
+        parts = [self._decl, '<movie>']
+        append = parts.append
+        
+        def element(tag: str, text: Optional[str]) -> str:
+            if text:
+                return f'<{tag}>{_escape(text)}</{tag}>'
+            return f'<{tag} />'
+        
+        def add(tag: str, text: Optional[str]) -> None:
+            append(element(tag, text))
+        
+        # Basic metadata
+        add('title', g('title', ''))
+        add('originaltitle', g('originaltitle', ''))
+        add('tagline', g('tagline', ''))
+        add('plot', g('plot', ''))
+        add('userrating', str(g('userrating', 0)))
+        
+        # Date, studio and runtime are only written when set
+        premiered = g('premiered')
+        if premiered:
+            add('premiered', premiered)
+        
+        year = g('year')
+        if year:
+            add('year', str(year))
+        
+        studio = g('studio')
+        if studio:
+            add('studio', studio)
+        
+        runtime = g('runtime')
+        if runtime:
+            add('runtime', str(runtime))
+        
+        # Unique ID
+        uniqueid_data = g('uniqueid')
+        if uniqueid_data:
+            try:
+                uid = uniqueid_data.get
+            except AttributeError:  # Not a mapping; nothing to write
+                pass
+            else:
+                attrs = f' type="{escape(uid("type", "stash"), _ATTR_ENTITIES)}"'
+                if uid('default'):
+                    attrs += ' default="true"'
+                value = uid('value', '')
+                if value:
+                    append(f'<uniqueid{attrs}>{_escape(value)}</uniqueid>')
+                else:
+                    append(f'<uniqueid{attrs} />')
+        
+        # Genres, then the same values as tags
+        genres = [genre for genre in g('genres', []) if genre]
+        for genre in genres:
+            add('genre', genre)
+        for genre in genres:
+            add('tag', genre)
+        
+        # Actors
+        for actor_data in g('actors', []):
+            if not isinstance(actor_data, dict):
+                continue
+            
+            # Children are collected first to know whether the actor is empty
+            children = []
+            name = actor_data.get('name', '')
+            if name:
+                children.append(element('name', name))
+            
+            role = actor_data.get('role', '')
+            if role:
+                children.append(element('role', role))
+            
+            order = actor_data.get('order')
+            if order is not None:
+                children.append(element('order', str(order)))
+            
+            if children:
+                append('<actor>')
+                parts.extend(children)
+                append('</actor>')
+            else:
+                append('<actor />')
+        
+        append('</movie>')
+        xml_str = ''.join(parts)
+        if _XML_INVALID.search(xml_str):
+            return self._fast_movie_nfo(_clean_data(nfo_data))
+        return xml_str
+    
+    def _generate_actor_nfo(self, nfo_data: Dict[str, Any]) -> ET.Element:
+        """Generate actor/performer NFO XML tree."""
+        SubElement = ET.SubElement
+        g = nfo_data.get
         root = ET.Element('actor')
         
         # Basic information
-        self._add_text_element(root, 'name', nfo_data.get('name', ''))
+        SubElement(root, 'name').text = g('name', '') or ''
         
-        biography = nfo_data.get('biography', '')
+        biography = g('biography', '')
         if biography:
-            self._add_text_element(root, 'biography', biography)
+            SubElement(root, 'biography').text = biography
         
-        birthdate = nfo_data.get('birthdate')
+        birthdate = g('birthdate')
         if birthdate:
-            self._add_text_element(root, 'birthdate', birthdate)
-        
-        # Additional details as custom elements
-        details = nfo_data.get('details', {})
-        if isinstance(details, dict):
-            for key, value in details.items():
-                if value:  # Only add non-empty values
-                    if isinstance(value, list):
-                        for item in value:
-                            if item:
-                                self._add_text_element(root, key, str(item))
-                    else:
-                        self._add_text_element(root, key, str(value))
+            SubElement(root, 'birthdate').text = birthdate
         
-        # Social media information
-        social = nfo_data.get('social', {})
-        if isinstance(social, dict):
-            for key, value in social.items():
-                if value:
-                    self._add_text_element(root, key, str(value))
+        # Additional details as custom elements (only non-empty values)
+        details = [(k, v) for k, v in (g('details') or {}).items() if v]
+        for key, value in details:
+            if type(value) is list:
+                for item in value:
+                    if item:
+                        SubElement(root, key).text = str(item)
+            else:
+                SubElement(root, key).text = str(value)
         
-        return self._format_xml(root)
-    
-    def _add_text_element(self, parent: ET.Element, tag: str, text: str) -> ET.Element:
-        """
-        Add a text element to the parent.
+        # Social media information
+        social = [(k, v) for k, v in (g('social') or {}).items() if v]
+        for key, value in social:
+            SubElement(root, key).text = str(value)
         
-        Args:
-            parent: Parent XML element
-            tag: Tag name
-            text: Text content
-            
-        Returns:
-            Created element
-        """
-        elem = ET.SubElement(parent, tag)
-        elem.text = text if text else ''
-        return elem
+        return root
     
     def _format_xml(self, root: ET.Element) -> str:
         """
@@ -175,22 +407,10 @@ class NfoGenerator:
         Returns:
             Formatted XML string
         """
-        # Convert to string
-        xml_str = ET.tostring(root, encoding='unicode')
-        
         if self.pretty_print:
-            # Use minidom for pretty printing
-            dom = minidom.parseString(xml_str)
-            pretty_xml = dom.documentElement.toprettyxml(indent='  ')
-            
-            # Remove empty lines and fix formatting
-            lines = [line for line in pretty_xml.split('\n') if line.strip()]
-            xml_str = '\n'.join(lines)
+            # Indent in place rather than re-parsing with minidom
+            ET.indent(root, space='  ')
+        xml_str = ET.tostring(root, encoding='unicode')
         
         # Add XML declaration
-        xml_declaration = f'<?xml version="1.0" encoding="{self.encoding}" standalone="yes" ?>'
-        
-        if self.pretty_print:
-            return f"{xml_declaration}\n{xml_str}"
-        else:
-            return f"{xml_declaration}{xml_str}"
+        return self._decl + xml_str
@@ -2,30 +2,79 @@
 StashApp JSON parsers for different data types.
 """
 
+import functools
 import json
+import os
 from pathlib import Path
 from typing import Dict, Any, Union
 
+try:
+    # orjson decodes straight from bytes in native code; its JSONDecodeError
+    # subclasses json.JSONDecodeError, so error handling is unchanged
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Top-level keys that identify each StashApp data type, used by detect_type
+_PERFORMER_KEYS = frozenset(('gender', 'birthdate', 'ethnicity', 'measurements'))
+_GALLERY_KEYS = frozenset(('folder', 'scenes'))
+_SCENE_METADATA_KEYS = frozenset(('title', 'studio', 'tags', 'performers'))
+_DETECT_KEYS = (_PERFORMER_KEYS | _GALLERY_KEYS | _SCENE_METADATA_KEYS
+                | {'file'})
+
+
+# Larger files usually embed base64 images; keeping a few of those parsed
+# would hold on to tens of MB, so they are always read afresh
+_CACHE_MAX_BYTES = 1 << 20
+
+
+def _read_json(path_str: str) -> Dict[str, Any]:
+    """Read and parse a JSON file."""
+    with open(path_str, 'rb') as f:
+        return _loads(f.read())
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_cached(path_str: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """
+    Parse a JSON file, cached on its path, modification time and size.
+    
+    mtime_ns and size are not used here; they are part of the cache key so
+    that an edited file is parsed again.
+    """
+    return _read_json(path_str)
+
 
 class StashParser:
     """Parser for StashApp JSON files."""
     
-    def parse_file(self, file_path: Union[str, Path]) -> Dict[str, Any]:
+    def parse_file(self, file_path: Union[str, Path], cache: bool = False) -> Dict[str, Any]:
         """
         Parse a StashApp JSON file.
         
         Args:
             file_path: Path to the JSON file
+            cache: Keep the result for callers that parse the same file
+                repeatedly (the CLI reads each file once, so it doesn't)
             
         Returns:
-            Parsed JSON data as dictionary
+            Parsed JSON data as dictionary. With cache=True, unchanged files
+            up to 1 MiB are only parsed once and the same dictionary is
+            returned each time, so callers must not modify it.
             
         Raises:
             FileNotFoundError: If the file doesn't exist
             json.JSONDecodeError: If the file contains invalid JSON
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        path_str = os.path.abspath(file_path)
+        if not cache:
+            return _read_json(path_str)
+        
+        st = os.stat(path_str)
+        if st.st_size > _CACHE_MAX_BYTES:
+            return _read_json(path_str)
+        return _parse_cached(path_str, st.st_mtime_ns, st.st_size)
     
     def detect_type(self, data: Dict[str, Any]) -> str:
         """
@@ -37,21 +86,23 @@ class StashParser:
         Returns:
             Detected type: 'scene', 'performer', 'gallery', or 'unknown'
         """
+        # Intersect once, then test membership against the small result
+        keys = data.keys() & _DETECT_KEYS
+        
         # Check for scene-specific fields
-        if any(key in data for key in ['file', 'duration', 'performers']):
-            if 'file' in data and isinstance(data['file'], dict):
-                return 'scene'
+        if 'file' in keys and isinstance(data['file'], dict):
+            return 'scene'
         
         # Check for performer-specific fields
-        if any(key in data for key in ['gender', 'birthdate', 'ethnicity', 'measurements']):
+        if not keys.isdisjoint(_PERFORMER_KEYS):
             return 'performer'
         
         # Check for gallery-specific fields
-        if any(key in data for key in ['folder', 'scenes']) and 'performers' in data:
+        if 'performers' in keys and not keys.isdisjoint(_GALLERY_KEYS):
             return 'gallery'
         
         # Default to scene if has basic metadata fields
-        if any(key in data for key in ['title', 'studio', 'tags', 'performers']):
+        if not keys.isdisjoint(_SCENE_METADATA_KEYS):
             return 'scene'
         
         return 'unknown'
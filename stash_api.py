@@ -2,10 +2,142 @@
 StashApp API client for direct data retrieval.
 """
 
+import functools
+import hashlib
+import json
+import os
 import sys
-from typing import Dict, Any, Optional, List
-import stashapi.log as log
-from stashapi.stashapp import StashInterface
+import tempfile
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Optional, List, Union
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
+# Default lifetime of cached API responses, in seconds
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+
+
+# Raw GraphQL queries, built once at import. Fragments such as ...Scene are
+# filled in by StashInterface.call_GQL.
+
+# Use raw GraphQL for gallery since stashapp-tools might not have direct method
+_GALLERY_QUERY = """
+query FindGallery($id: ID!) {
+    findGallery(id: $id) {
+        id
+        title
+        url
+        date
+        details
+        rating
+        organized
+        studio {
+            name
+        }
+        performers {
+            name
+        }
+        tags {
+            name
+        }
+        scenes {
+            id
+            title
+        }
+        folder {
+            path
+        }
+        images {
+            path
+        }
+        cover
+        created_at
+        updated_at
+    }
+}
+"""
+
+# Scene lookup by path or search selecting the same ...Scene fragment as
+# StashInterface.find_scene, so matches are returned in full without a
+# second request
+_FIND_SCENES_FULL_QUERY = """
+query FindScenes($filter: FindFilterType, $scene_filter: SceneFilterType) {
+    findScenes(filter: $filter, scene_filter: $scene_filter) {
+        scenes {
+            ...Scene
+        }
+    }
+}
+"""
+
+# Fetch only the modification time, to revalidate expired cache entries
+# without downloading the full object again
+_UPDATED_AT_QUERIES = {
+    data_type: f"""
+query Find{data_type.title()}($id: ID!) {{
+    find{data_type.title()}(id: $id) {{
+        updated_at
+    }}
+}}
+"""
+    for data_type in ("scene", "performer", "gallery")
+}
+
+_SEARCH_SCENES_QUERY = """
+query FindScenes($filter: FindFilterType, $scene_filter: SceneFilterType) {
+    findScenes(filter: $filter, scene_filter: $scene_filter) {
+        scenes {
+            id
+            title
+            studio {
+                name
+            }
+            performers {
+                name
+            }
+            files {
+                path
+            }
+        }
+    }
+}
+"""
+
+
+def default_cache_dir() -> Path:
+    """Return the per-user directory for cached API responses."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "stash_to_nfo"
+
+
+def _cached(data_type: str) -> Callable:
+    """
+    Cache a get_<type>(id) method's results on disk.
+    
+    Only active when the client was created with a cache_dir. The wrapped
+    method takes an extra store argument; store=False still reads the cache
+    but doesn't write a fetched result (see cache_store).
+    
+    Args:
+        data_type: Type of data the method returns ('scene', 'performer', 'gallery')
+    """
+    def decorator(fetch: Callable) -> Callable:
+        @functools.wraps(fetch)
+        def wrapper(self, item_id: int, store: bool = True) -> Dict[str, Any]:
+            if self.cache_dir is None:
+                return fetch(self, item_id)
+            return self._cached_fetch(data_type, item_id, fetch, store)
+        return wrapper
+    return decorator
 
 
 class StashApiClient:
@@ -13,7 +145,9 @@ class StashApiClient:
     
     def __init__(self, host: str = "localhost", port: str = "9999", 
                  scheme: str = "http", api_key: Optional[str] = None,
-                 username: Optional[str] = None, password: Optional[str] = None):
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 cache_dir: Optional[Union[str, Path]] = None,
+                 cache_ttl: float = DEFAULT_CACHE_TTL, cache_refresh: bool = False):
         """
         Initialize the StashApp API client.
         
@@ -24,7 +158,24 @@ class StashApiClient:
             api_key: API key for authentication
             username: Username for authentication (alternative to API key)
             password: Password for authentication (alternative to API key)
+            cache_dir: Directory for caching scene/performer/gallery lookups
+                (default: no caching); each server gets its own subdirectory
+            cache_ttl: Seconds a cached response is used without checking
+                StashApp for changes
+            cache_refresh: Ignore cached responses but still update the cache
         """
+        self.cache_dir = None
+        if cache_dir is not None:
+            # IDs are only unique per server, so key entries by endpoint
+            endpoint = f"{scheme}://{host}:{port}".encode()
+            self.cache_dir = Path(cache_dir) / hashlib.sha256(endpoint).hexdigest()[:16]
+        self.cache_ttl = cache_ttl
+        self.cache_refresh = cache_refresh
+        
+        # stashapi pulls in requests and friends; only load it for a client
+        import stashapi.log as log
+        from stashapi.stashapp import StashInterface
+        
         self.config = {
             "scheme": scheme,
             "host": host,
@@ -39,6 +190,14 @@ class StashApiClient:
             self.config["username"] = username
             self.config["password"] = password
         
+        # The connection details don't change once configured
+        self._conn_info = MappingProxyType({
+            "host": host,
+            "port": port,
+            "scheme": scheme,
+            "authenticated": "ApiKey" in self.config or "username" in self.config
+        })
+        
         try:
             self.stash = StashInterface(self.config)
             # Test connection
@@ -54,6 +213,95 @@ class StashApiClient:
         except Exception as e:
             raise ConnectionError(f"Cannot connect to StashApp API: {e}")
     
+    def _cached_fetch(self, data_type: str, item_id: int, fetch: Callable,
+                      store: bool = True) -> Dict[str, Any]:
+        """
+        Return a cached response, or fetch it and (if store) cache it.
+        
+        A fresh entry is returned as-is. An expired one is kept if StashApp
+        reports the same updated_at, which costs a small query instead of a
+        full download.
+        """
+        path = self.cache_dir / f"{data_type}_{item_id}.json"
+        
+        if not self.cache_refresh:
+            try:
+                mtime = path.stat().st_mtime
+                cached = _loads(path.read_bytes())
+            except (OSError, ValueError):
+                cached = None
+            
+            if isinstance(cached, dict):
+                if time.time() - mtime < self.cache_ttl:
+                    return cached
+                
+                updated_at = cached.get("updated_at")
+                if updated_at and self._get_updated_at(data_type, item_id) == updated_at:
+                    # Unchanged; restart the entry's lifetime (best effort,
+                    # e.g. the cache may be read-only)
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    return cached
+        
+        data = fetch(self, item_id)
+        if store:
+            self._write_cache(path, data_type, item_id, data)
+        return data
+    
+    def cache_store(self, data_type: str, item_id: int, data: Dict[str, Any]) -> None:
+        """
+        Cache an object fetched with store=False.
+        
+        Nothing is written when the object came from a still-fresh entry,
+        so its lifetime isn't extended without revalidation.
+        
+        Args:
+            data_type: Type of the object ('scene', 'performer', 'gallery')
+            item_id: StashApp ID of the object
+            data: Object as returned by get_<type>()
+        """
+        if self.cache_dir is None:
+            return
+        
+        path = self.cache_dir / f"{data_type}_{item_id}.json"
+        if not self.cache_refresh:
+            try:
+                if time.time() - path.stat().st_mtime < self.cache_ttl:
+                    return
+            except OSError:
+                pass
+        self._write_cache(path, data_type, item_id, data)
+    
+    def _write_cache(self, path: Path, data_type: str, item_id: int,
+                     data: Dict[str, Any]) -> None:
+        """Atomically replace a cache entry."""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # A unique temporary file per writer: --batch threads in one
+            # process may store the same entry at once
+            fd, tmp_name = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp",
+                                            dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(_dumps(data))
+                os.replace(tmp_name, path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        except OSError as e:
+            print(f"Warning: Could not cache {data_type} {item_id}: {e}", file=sys.stderr)
+    
+    def _get_updated_at(self, data_type: str, item_id: int) -> Optional[str]:
+        """Get an object's updated_at timestamp, or None if unavailable."""
+        try:
+            result = self.stash.call_GQL(_UPDATED_AT_QUERIES[data_type], {"id": str(item_id)})
+            return (result.get(f"find{data_type.title()}") or {}).get("updated_at")
+        except Exception:
+            return None
+    
+    @_cached("scene")
     def get_scene(self, scene_id: int) -> Dict[str, Any]:
         """
         Get scene data by ID.
@@ -72,6 +320,7 @@ class StashApiClient:
         except Exception as e:
             raise RuntimeError(f"Failed to fetch scene {scene_id}: {e}")
     
+    @_cached("performer")
     def get_performer(self, performer_id: int) -> Dict[str, Any]:
         """
         Get performer data by ID.
@@ -90,6 +339,7 @@ class StashApiClient:
         except Exception as e:
             raise RuntimeError(f"Failed to fetch performer {performer_id}: {e}")
     
+    @_cached("gallery")
     def get_gallery(self, gallery_id: int) -> Dict[str, Any]:
         """
         Get gallery data by ID.
@@ -101,45 +351,8 @@ class StashApiClient:
             Gallery data dictionary
         """
         try:
-            # Use raw GraphQL for gallery since stashapp-tools might not have direct method
-            query = """
-            query FindGallery($id: ID!) {
-                findGallery(id: $id) {
-                    id
-                    title
-                    url
-                    date
-                    details
-                    rating
-                    organized
-                    studio {
-                        name
-                    }
-                    performers {
-                        name
-                    }
-                    tags {
-                        name
-                    }
-                    scenes {
-                        id
-                        title
-                    }
-                    folder {
-                        path
-                    }
-                    images {
-                        path
-                    }
-                    cover
-                    created_at
-                    updated_at
-                }
-            }
-            """
-            
             variables = {"id": str(gallery_id)}
-            result = self.stash.call_GQL(query, variables)
+            result = self.stash.call_GQL(_GALLERY_QUERY, variables)
             
             if not result or not result.get("findGallery"):
                 raise ValueError(f"Gallery with ID {gallery_id} not found")
@@ -159,31 +372,18 @@ class StashApiClient:
             Scene data dictionary or None if not found
         """
         try:
-            query = """
-            query FindScenes($filter: FindFilterType, $scene_filter: SceneFilterType) {
-                findScenes(filter: $filter, scene_filter: $scene_filter) {
-                    scenes {
-                        id
-                        title
-                        files {
-                            path
-                        }
-                    }
-                }
-            }
-            """
-            
             variables = {
-                "filter": {"per_page": -1},
+                # Only the first match is used, so don't ask for every page
+                "filter": {"per_page": 1},
                 "scene_filter": {"path": {"value": file_path, "modifier": "EQUALS"}}
             }
             
-            result = self.stash.call_GQL(query, variables)
+            result = self.stash.call_GQL(_FIND_SCENES_FULL_QUERY, variables)
             scenes = result.get("findScenes", {}).get("scenes", [])
             
             if scenes:
-                # Return the full scene data for the first match
-                return self.get_scene(int(scenes[0]["id"]))
+                # The query already returns the full scene data
+                return scenes[0]
             
             return None
         except Exception as e:
@@ -202,41 +402,41 @@ class StashApiClient:
             List of scene data dictionaries
         """
         try:
-            search_query = """
-            query FindScenes($filter: FindFilterType, $scene_filter: SceneFilterType) {
-                findScenes(filter: $filter, scene_filter: $scene_filter) {
-                    scenes {
-                        id
-                        title
-                        studio {
-                            name
-                        }
-                        performers {
-                            name
-                        }
-                        files {
-                            path
-                        }
-                    }
-                }
+            variables = {
+                "filter": {"per_page": limit, "q": query},
+                "scene_filter": {}
             }
-            """
             
+            result = self.stash.call_GQL(_SEARCH_SCENES_QUERY, variables)
+            return result.get("findScenes", {}).get("scenes", [])
+        except Exception as e:
+            raise RuntimeError(f"Failed to search scenes: {e}")
+    
+    def search_scenes_full(self, query: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Search scenes by text query, returning full scene data.
+        
+        Unlike search_scenes(), each match has the same fields as
+        get_scene(), so it can be converted without another request.
+        
+        Args:
+            query: Search query string
+            limit: Maximum number of results
+            
+        Returns:
+            List of full scene data dictionaries
+        """
+        try:
             variables = {
                 "filter": {"per_page": limit, "q": query},
                 "scene_filter": {}
             }
             
-            result = self.stash.call_GQL(search_query, variables)
+            result = self.stash.call_GQL(_FIND_SCENES_FULL_QUERY, variables)
             return result.get("findScenes", {}).get("scenes", [])
         except Exception as e:
             raise RuntimeError(f"Failed to search scenes: {e}")
     
     def get_connection_info(self) -> Dict[str, Any]:
         """Get connection information for display."""
-        return {
-            "host": self.config["host"],
-            "port": self.config["port"], 
-            "scheme": self.config["scheme"],
-            "authenticated": "ApiKey" in self.config or ("username" in self.config and "password" in self.config)
-        }
\ No newline at end of file
+        return dict(self._conn_info)
\ No newline at end of file
@@ -5,28 +5,445 @@ Converts StashApp JSON metadata files into Kodi/Jellyfin compatible NFO files.
 """
 
 import argparse
-import json
+import functools
 import os
+import re
+import stat
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from parsers import StashParser
-from converters import StashToNfoConverter
-from nfo_generator import NfoGenerator
-from stash_api import StashApiClient
+# Characters dropped from titles used as output file names: anything but
+# letters, digits, spaces, '-' and '_'
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w \-]')
 
 
-def main():
-    """Main entry point for the StashApp to NFO converter."""
+def _expand_inputs(patterns: List[str]) -> List[str]:
+    """
+    Expand glob patterns among the input arguments.
+    
+    Arguments naming an existing file are used as-is, even if they contain
+    glob characters (titles like "Scene [1080p]"). Patterns that match
+    nothing are kept as-is so they are reported as missing files.
+    
+    Args:
+        patterns: Input paths and/or glob patterns
+        
+    Returns:
+        List of input paths
+    """
+    inputs = []
+    for pattern in patterns:
+        matches = []
+        if any(c in pattern for c in '*?[') and not os.path.lexists(pattern):
+            import glob
+            matches = sorted(glob.glob(pattern))
+        inputs.extend(matches or [pattern])
+    return inputs
+
+
+@functools.cache
+def _generator(encoding: str, pretty_print: bool) -> Any:
+    """
+    Return the NfoGenerator for an output format, built once per process.
+    
+    Generators hold no per-document state, so every conversion with the
+    same settings shares one. Converters collect extracted images and are
+    still created for each item.
+    """
+    from nfo_generator import NfoGenerator
+    
+    return NfoGenerator(encoding=encoding, pretty_print=pretty_print)
+
+
+def _convert_one(input_file: str, args: argparse.Namespace) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Convert a single JSON file to an NFO next to it (batch mode worker).
+    
+    Runs in a worker process; the conversion modules are imported once
+    per process and reused for every file it handles.
+    
+    Args:
+        input_file: Path to the StashApp JSON file
+        args: Parsed command line arguments
+        
+    Returns:
+        Tuple of (output path or None if skipped, error message or None)
+    """
+    from parsers import StashParser
+    
+    generator = _generator(args.encoding, args.pretty)
+    try:
+        output_file = process_one(None, StashParser(), generator, input_file, args)
+    except Exception as e:
+        return os.path.splitext(input_file)[0] + '.nfo', str(e)
+    
+    return output_file, None
+
+
+def _convert_batch(inputs: List[str], args: argparse.Namespace,
+                   log: Callable[[str], None]) -> None:
+    """
+    Convert several JSON files in parallel worker processes.
+    
+    Each NFO is written next to its input file. Existing outputs are
+    skipped unless --overwrite is given, since workers can't prompt.
+    
+    Args:
+        inputs: Paths to the StashApp JSON files
+        args: Parsed command line arguments
+        log: Records a verbose message (a no-op without --verbose)
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    
+    pending = []
+    for input_file in inputs:
+        if not os.path.isfile(input_file):
+            print(f"Error: Input file '{input_file}' does not exist or is not a file.", file=sys.stderr)
+            sys.exit(1)
+        
+        if not args.overwrite and os.path.lexists(os.path.splitext(input_file)[0] + '.nfo'):
+            print(f"Skipping '{input_file}': output file already exists (use --overwrite)")
+            continue
+        
+        pending.append(input_file)
+    
+    converted = failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = executor.map(partial(_convert_one, args=args), pending, chunksize=8)
+        for input_file, (output_file, error) in zip(pending, results):
+            if error:
+                failed += 1
+                print(f"Error: Failed to convert '{input_file}': {error}", file=sys.stderr)
+            elif output_file is None:
+                print(f"Skipping '{input_file}': output file already exists (use --overwrite)")
+            else:
+                converted += 1
+                log(f"Successfully converted '{input_file}' to '{output_file}'\n")
+    
+    print(f"Converted {converted} of {converted + failed} files")
+    if failed:
+        sys.exit(1)
+
+
+def _fetchers(stash_client: Any) -> Tuple[Tuple[str, Callable[[int], Dict[str, Any]]], ...]:
+    """
+    List a client's lookup-by-ID methods, in order of preference.
+    
+    Args:
+        stash_client: Connected StashApiClient
+        
+    Returns:
+        Tuple of (data type, fetch function) pairs
+    """
+    return (
+        ("scene", stash_client.get_scene),
+        ("performer", stash_client.get_performer),
+        ("gallery", stash_client.get_gallery),
+    )
+
+
+def _fetch_any_type(stash_client: Any, stash_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Look up an ID as a scene, performer and gallery concurrently.
+    
+    The three requests run in parallel, so an unknown type costs one round
+    trip rather than up to three. IDs are shared between types, so the
+    result is still chosen in order of preference: scene, performer, gallery.
+    Only the chosen result is written to the lookup cache.
+    
+    Args:
+        stash_client: Connected StashApiClient
+        stash_id: StashApp ID to look up
+        
+    Returns:
+        Tuple of (data, data type), or (None, None) if nothing was found
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    fetchers = _fetchers(stash_client)
+    
+    executor = ThreadPoolExecutor(max_workers=len(fetchers))
+    try:
+        futures = [(data_type, executor.submit(fetch, stash_id, store=False))
+                   for data_type, fetch in fetchers]
+        for data_type, future in futures:
+            try:
+                stash_data = future.result()
+            except Exception:
+                continue
+            if stash_data:
+                stash_client.cache_store(data_type, stash_id, stash_data)
+                return stash_data, data_type
+    finally:
+        # Return without waiting for lower-priority lookups; any still in
+        # flight are joined when the interpreter exits, not stopped
+        executor.shutdown(wait=False)
+    
+    return None, None
+
+
+def _fetch_by_id(stash_client: Any, stash_id: int, data_type: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Fetch a StashApp object by ID.
+    
+    Args:
+        stash_client: Connected StashApiClient
+        stash_id: StashApp ID to look up
+        data_type: 'scene', 'performer', 'gallery', or 'auto' to try each
+        
+    Returns:
+        Tuple of (data, data type)
+        
+    Raises:
+        ValueError: If no object with the ID exists (auto)
+        RuntimeError: If the lookup for the given type fails
+    """
+    if data_type == "auto":
+        # Look the ID up as every type at once
+        stash_data, data_type = _fetch_any_type(stash_client, stash_id)
+        if not stash_data:
+            raise ValueError(f"Could not find any data with ID {stash_id} (tried scene, performer, gallery)")
+        return stash_data, data_type
+    
+    return dict(_fetchers(stash_client))[data_type](stash_id), data_type
+
+
+def _api_output_path(stash_data: Dict[str, Any], fallback_id: Any) -> Path:
+    """
+    Build an output NFO path in the current directory from an object's title.
+    
+    Args:
+        stash_data: StashApp data fetched from the API
+        fallback_id: ID (or label) naming the file "stash_<id>.nfo" when the
+            title is missing or has no usable characters
+        
+    Returns:
+        Output NFO file path
+    """
+    title = stash_data.get('title')
+    if title:
+        # Sanitize filename
+        safe_title = _UNSAFE_FILENAME_CHARS.sub('', title).strip().replace(" ", "_")
+        if safe_title:
+            return Path(f"{safe_title}.nfo")
+    
+    return Path(f"stash_{fallback_id}.nfo")
+
+
+def _create_client(args: argparse.Namespace) -> Any:
+    """
+    Create a StashApiClient from the command line connection options.
+    
+    Args:
+        args: Parsed command line arguments
+        
+    Returns:
+        Connected StashApiClient
+    """
+    from stash_api import DEFAULT_CACHE_TTL, StashApiClient, default_cache_dir
+    
+    return StashApiClient(
+        host=args.stash_host,
+        port=args.stash_port, 
+        scheme=args.stash_scheme,
+        api_key=args.stash_api_key,
+        username=args.stash_username,
+        password=args.stash_password,
+        cache_dir=None if args.no_cache else default_cache_dir(),
+        cache_ttl=DEFAULT_CACHE_TTL if args.cache_ttl is None else args.cache_ttl,
+        cache_refresh=args.cache_refresh
+    )
+
+
+def process_one(stash_client: Any, parser_instance: Any, generator: Any,
+                item: str, args: argparse.Namespace,
+                claim_output: Optional[Callable[[Path, str], Path]] = None) -> Optional[str]:
+    """
+    Convert one batch entry: a StashApp ID or a JSON file path.
+    
+    JSON files get an NFO next to them; objects fetched by ID are named
+    after their title in the current directory. Entries can share a
+    directory, so extracted posters and fanart are named after the NFO
+    (<name>-poster.jpg) rather than poster.jpg. The client, parser and
+    generator are shared between entries, so this may run on several
+    threads at once.
+    
+    Args:
+        stash_client: Connected StashApiClient, or None if every entry is
+            a file
+        parser_instance: StashParser for JSON files
+        generator: NfoGenerator writing the output
+        item: StashApp ID (digits only, when a client is given) or path
+            to a JSON file
+        args: Parsed command line arguments
+        claim_output: Reserves the title-based path of an ID entry for this
+            run and returns the path to write, which differs if another
+            entry already has it
+        
+    Returns:
+        Path of the written NFO file, or None if it already existed and
+        --overwrite wasn't given
+    """
+    from converters import StashToNfoConverter
+    
+    if stash_client is not None and item.isdigit():
+        stash_data, data_type = _fetch_by_id(stash_client, int(item), args.type)
+        output_path = _api_output_path(stash_data, item)
+        if claim_output is not None:
+            output_path = claim_output(output_path, item)
+        if not args.overwrite and os.path.lexists(output_path):
+            return None
+    else:
+        output_path = os.path.splitext(item)[0] + '.nfo'
+        if not args.overwrite and os.path.lexists(output_path):
+            return None
+        
+        stash_data = parser_instance.parse_file(item)
+        data_type = args.type
+        if data_type == "auto":
+            data_type = parser_instance.detect_type(stash_data)
+    
+    # Converters keep per-call state (extracted images), so don't share them
+    converter = StashToNfoConverter()
+    nfo_data = converter.convert(stash_data, data_type)
+    
+    if args.extract_images:
+        converter.extract_images(stash_data, Path(output_path), shared_dir=True)
+    
+    generator.generate_to_file(nfo_data, data_type, output_path)
+    return str(output_path)
+
+
+def _run_batch(args: argparse.Namespace, log: Callable[[str], None]) -> None:
+    """
+    Convert every entry listed in the --batch file in one process.
+    
+    One API connection, parser and generator are reused for all entries,
+    and entries run on a thread pool so API round trips overlap. Each
+    entry writes its own NFO: ID entries whose title names a file already
+    taken in this run get the ID appended (Title_5.nfo), and file entries
+    that would write the same NFO as an earlier one are reported as
+    failures.
+    
+    Args:
+        args: Parsed command line arguments
+        log: Records a verbose message (a no-op without --verbose)
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from parsers import StashParser
+    
+    try:
+        with open(args.batch, encoding='utf-8') as f:
+            items = [line.strip() for line in f]
+    except OSError as e:
+        print(f"Error: Cannot read batch file: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    # Skip blank lines, comments and repeated entries
+    items = list(dict.fromkeys(item for item in items if item and not item.startswith('#')))
+    
+    stash_client = None
+    if any(item.isdigit() for item in items):
+        try:
+            stash_client = _create_client(args)
+        except Exception as e:
+            print(f"Error connecting to StashApp: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    parser_instance = StashParser()
+    generator = _generator(args.encoding, args.pretty)
+    
+    # Entries converted at the same time must not write the same NFO. File
+    # entries' outputs are known up front; ID entries are named after the
+    # fetched title and get the ID appended when that name is taken
+    claimed: Dict[str, str] = {}
+    claim_lock = threading.Lock()
+    failed = 0
+    for item in list(items):
+        if stash_client is not None and item.isdigit():
+            continue
+        output_key = os.path.abspath(os.path.splitext(item)[0] + '.nfo')
+        if output_key in claimed:
+            failed += 1
+            items.remove(item)
+            print(f"Error: Failed to convert '{item}': writes the same NFO as '{claimed[output_key]}'",
+                  file=sys.stderr)
+        else:
+            claimed[output_key] = item
+    
+    def claim_output(output_path: Path, item: str) -> Path:
+        with claim_lock:
+            if os.path.abspath(output_path) in claimed:
+                output_path = output_path.with_name(f"{output_path.stem}_{item}.nfo")
+            output_key = os.path.abspath(output_path)
+            if output_key in claimed:
+                raise ValueError(f"'{output_path}' is already written by '{claimed[output_key]}'")
+            claimed[output_key] = item
+        return output_path
+    
+    def convert(item: str) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            return process_one(stash_client, parser_instance, generator, item, args,
+                               claim_output), None
+        except Exception as e:
+            return None, str(e)
+    
+    converted = 0
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        for item, (output_file, error) in zip(items, executor.map(convert, items)):
+            if error:
+                failed += 1
+                print(f"Error: Failed to convert '{item}': {error}", file=sys.stderr)
+            elif output_file is None:
+                print(f"Skipping '{item}': output file already exists (use --overwrite)")
+            else:
+                converted += 1
+                log(f"Successfully converted '{item}' to '{output_file}'\n")
+    
+    print(f"Converted {converted} of {converted + failed} items")
+    if failed:
+        sys.exit(1)
+
+
+def _discard(message: str) -> None:
+    """Drop a verbose message when --verbose isn't given."""
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+@functools.cache
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command line parser.
+    
+    Cached, so repeated main() calls (e.g. from scripts or tests) reuse
+    one parser instead of rebuilding it.
+    
+    Returns:
+        Configured ArgumentParser
+    """
     parser = argparse.ArgumentParser(
         description="Convert StashApp JSON metadata files to Kodi/Jellyfin NFO format",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
-  %(prog)s scene.json scene.nfo
-  %(prog)s --type performer performer.json performer.nfo
-  %(prog)s --type gallery gallery.json gallery.nfo
+  %(prog)s scene.json -o scene.nfo
+  %(prog)s --type performer performer.json -o performer.nfo
+  %(prog)s --type gallery gallery.json -o gallery.nfo
+  %(prog)s --jobs 4 scenes/*.json
+  %(prog)s --batch ids.txt
         """
     )
     
@@ -35,8 +452,10 @@ Examples:
     
     input_group.add_argument(
         "input_file",
-        nargs="?",
-        help="Path to the StashApp JSON file"
+        nargs="*",
+        default=[],
+        help="Path to the StashApp JSON file; several files or glob patterns are "
+             "converted in parallel"
     )
     
     input_group.add_argument(
@@ -50,10 +469,18 @@ Examples:
         help="Search StashApp by query string and convert first result"
     )
     
+    input_group.add_argument(
+        "--batch",
+        type=Path,
+        help="File listing StashApp IDs and/or JSON file paths to convert, one per line"
+    )
+    
     parser.add_argument(
-        "output_file", 
-        nargs="?",
-        help="Path for the output NFO file (optional, auto-generated based on input)"
+        "--output", "-o",
+        dest="output_file",
+        metavar="OUTPUT",
+        help="Output NFO file for a single input (default: next to the JSON file, "
+             "or named after the title for StashApp lookups)"
     )
     
     parser.add_argument(
@@ -93,6 +520,12 @@ Examples:
         help="Extract and save base64 encoded images alongside NFO file"
     )
     
+    parser.add_argument(
+        "--jobs", "-j",
+        type=_positive_int,
+        help="Parallel workers for converting several files or a --batch list"
+    )
+    
     # StashApp API connection options
     api_group = parser.add_argument_group("StashApp API Options", "Configure connection to local StashApp instance")
     
@@ -130,13 +563,97 @@ Examples:
         help="StashApp password (use with username)"
     )
     
-    args = parser.parse_args()
+    api_group.add_argument(
+        "--cache-ttl",
+        type=float,
+        # None means stash_api.DEFAULT_CACHE_TTL, which isn't imported here
+        # so that --help and argument errors don't load the API module
+        help="Seconds to reuse cached StashApp responses before checking for changes (default: one day)"
+    )
+    
+    api_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write the StashApp response cache"
+    )
     
+    api_group.add_argument(
+        "--cache-refresh",
+        action="store_true",
+        help="Fetch fresh data from StashApp and update the cache"
+    )
+    
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Main entry point for the StashApp to NFO converter.
+    
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    args = build_parser().parse_args(argv)
+    
+    # Verbose messages are collected here and written to stderr in one go,
+    # including when the conversion exits early
+    log_buf: List[str] = []
+    log = log_buf.append if args.verbose else _discard
+    try:
+        _run(args, log)
+    finally:
+        if log_buf:
+            sys.stderr.writelines(log_buf)
+            sys.stderr.flush()
+
+
+def _run(args: argparse.Namespace, log: Callable[[str], None]) -> None:
+    """
+    Run the conversion described by the parsed command line arguments.
+    
+    Args:
+        args: Parsed command line arguments
+        log: Records a verbose message (a no-op without --verbose)
+    """
     # Validate input arguments
-    if not any([args.input_file, args.stash_id, args.search]):
-        print("Error: Must specify either input_file, --stash-id, or --search", file=sys.stderr)
+    if not any([args.input_file, args.stash_id, args.search, args.batch]):
+        print("Error: Must specify either input_file, --stash-id, --search, or --batch", file=sys.stderr)
         sys.exit(1)
     
+    # Two paths are a batch when the second is JSON (or an existing file
+    # that isn't an NFO); otherwise it is the older "input.json output.nfo"
+    # form, still accepted in favour of -o
+    if len(args.input_file) == 2:
+        second = args.input_file[1]
+        suffix = os.path.splitext(second)[1].lower()
+        if suffix != '.json' and (suffix == '.nfo' or not os.path.lexists(second)):
+            if args.output_file:
+                print("Error: Give the output file either with --output or as a second path, not both",
+                      file=sys.stderr)
+                sys.exit(1)
+            print(f"Warning: Naming the output as a second path is deprecated; use '-o {second}'",
+                  file=sys.stderr)
+            args.input_file, args.output_file = args.input_file[:1], second
+    
+    if args.batch:
+        if args.output_file:
+            print("Error: --output can't be used with --batch", file=sys.stderr)
+            sys.exit(1)
+        _run_batch(args, log)
+        return
+    
+    if not args.input_file:
+        args.input_file = None
+    else:
+        inputs = _expand_inputs(args.input_file)
+        if len(inputs) > 1:
+            if args.output_file:
+                print("Error: --output can only be used with a single input file", file=sys.stderr)
+                sys.exit(1)
+            _convert_batch(inputs, args, log)
+            return
+        args.input_file = inputs[0]
+    
     # Initialize variables
     stash_data = None
     data_source = None
@@ -146,11 +663,14 @@ Examples:
     if args.input_file:
         # File-based input (original method)
         input_path = Path(args.input_file)
-        if not input_path.exists():
+        # One stat answers both "exists" and "is a regular file"
+        try:
+            input_stat = os.stat(input_path)
+        except (FileNotFoundError, NotADirectoryError):
             print(f"Error: Input file '{args.input_file}' does not exist.", file=sys.stderr)
             sys.exit(1)
         
-        if not input_path.is_file():
+        if not stat.S_ISREG(input_stat.st_mode):
             print(f"Error: '{args.input_file}' is not a file.", file=sys.stderr)
             sys.exit(1)
         
@@ -160,28 +680,20 @@ Examples:
         if args.output_file:
             output_path = Path(args.output_file)
         else:
-            output_path = input_path.with_suffix('.nfo')
+            output_path = os.path.splitext(data_source)[0] + '.nfo'
     
     elif args.stash_id or args.search:
         # API-based input
         try:
             # Create API client
-            if args.verbose:
-                print(f"Connecting to StashApp at {args.stash_scheme}://{args.stash_host}:{args.stash_port}")
+            log(f"Connecting to StashApp at {args.stash_scheme}://{args.stash_host}:{args.stash_port}\n")
             
-            stash_client = StashApiClient(
-                host=args.stash_host,
-                port=args.stash_port, 
-                scheme=args.stash_scheme,
-                api_key=args.stash_api_key,
-                username=args.stash_username,
-                password=args.stash_password
-            )
+            stash_client = _create_client(args)
             
             if args.verbose:
                 conn_info = stash_client.get_connection_info()
                 auth_status = "authenticated" if conn_info["authenticated"] else "no authentication"
-                print(f"Connected to StashApp ({auth_status})")
+                log(f"Connected to StashApp ({auth_status})\n")
             
             # Fetch data based on method
             if args.stash_id:
@@ -189,41 +701,13 @@ Examples:
                 stash_id = args.stash_id
                 data_source = f"StashApp ID {stash_id}"
                 
-                if args.verbose:
-                    print(f"Fetching data for ID {stash_id}")
+                log(f"Fetching data for ID {stash_id}\n")
                 
                 # Try to determine type and fetch appropriate data
-                data_type = args.type if args.type != "auto" else None
-                
-                if data_type == "scene" or data_type is None:
-                    try:
-                        stash_data = stash_client.get_scene(stash_id)
-                        data_type = "scene"
-                    except Exception as e:
-                        if data_type == "scene":
-                            print(f"Error: {e}", file=sys.stderr)
-                            sys.exit(1)
-                
-                if (data_type == "performer" or data_type is None) and not stash_data:
-                    try:
-                        stash_data = stash_client.get_performer(stash_id)
-                        data_type = "performer"
-                    except Exception as e:
-                        if data_type == "performer":
-                            print(f"Error: {e}", file=sys.stderr)
-                            sys.exit(1)
-                
-                if (data_type == "gallery" or data_type is None) and not stash_data:
-                    try:
-                        stash_data = stash_client.get_gallery(stash_id)
-                        data_type = "gallery"
-                    except Exception as e:
-                        if data_type == "gallery":
-                            print(f"Error: {e}", file=sys.stderr)
-                            sys.exit(1)
-                
-                if not stash_data:
-                    print(f"Error: Could not find any data with ID {stash_id} (tried scene, performer, gallery)", file=sys.stderr)
+                try:
+                    stash_data, data_type = _fetch_by_id(stash_client, stash_id, args.type)
+                except Exception as e:
+                    print(f"Error: {e}", file=sys.stderr)
                     sys.exit(1)
                 
                 # Override type detection
@@ -234,107 +718,99 @@ Examples:
                 search_query = args.search
                 data_source = f"StashApp search '{search_query}'"
                 
-                if args.verbose:
-                    print(f"Searching for '{search_query}'")
+                log(f"Searching for '{search_query}'\n")
                 
-                # Search scenes (most common use case)
-                results = stash_client.search_scenes(search_query, limit=1)
+                # Search scenes (most common use case); the match comes back
+                # with full scene data, so no second lookup is needed
+                results = stash_client.search_scenes_full(search_query, limit=1)
                 if not results:
                     print(f"Error: No scenes found for search query '{search_query}'", file=sys.stderr)
                     sys.exit(1)
                 
-                # Get full data for first result
-                scene_id = int(results[0]["id"])
-                stash_data = stash_client.get_scene(scene_id)
+                stash_data = results[0]
+                scene_id = stash_data.get("id")
                 args.type = "scene"  # Override type since we searched scenes
                 
-                if args.verbose:
-                    print(f"Found scene: {stash_data.get('title', 'Unknown Title')} (ID: {scene_id})")
+                log(f"Found scene: {stash_data.get('title', 'Unknown Title')} (ID: {scene_id})\n")
             
             # Determine output file path for API data
             if args.output_file:
                 output_path = Path(args.output_file)
             else:
                 # Generate filename based on data
-                title = stash_data.get('title', f"stash_{args.stash_id or 'search'}")
-                # Sanitize filename
-                safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
-                safe_title = safe_title.replace(" ", "_")
-                output_path = Path(f"{safe_title}.nfo")
+                output_path = _api_output_path(stash_data, args.stash_id or 'search')
         
         except Exception as e:
             print(f"Error connecting to StashApp: {e}", file=sys.stderr)
             sys.exit(1)
     
     # Check if output file exists and handle overwrite
-    if output_path.exists() and not args.overwrite:
+    if not args.overwrite and os.path.lexists(output_path):
+        # Only ask when someone can answer; scripts must pass --overwrite
+        if not sys.stdin.isatty():
+            print(f"Error: Output file '{output_path}' already exists (use --overwrite to replace it)", file=sys.stderr)
+            sys.exit(1)
+        
         response = input(f"Output file '{output_path}' already exists. Overwrite? (y/N): ")
-        if response.lower() not in ['y', 'yes']:
+        if response[:1].lower() != 'y':
             print("Operation cancelled.")
             sys.exit(0)
     
+    # Imported only once there is work to do, so --help and argument or
+    # input errors exit without loading the conversion modules
+    import json
+    from parsers import StashParser
+    from converters import StashToNfoConverter
+    
     try:
         # Parse data (either from file or API)
         if args.input_file:
             # File-based parsing
-            if args.verbose:
-                print(f"Reading input file: {input_path}")
+            log(f"Reading input file: {input_path}\n")
             
             parser_instance = StashParser()
             stash_data = parser_instance.parse_file(input_path)
         
         # If we got data from API, stash_data is already set
-        if args.verbose:
-            print(f"Processing data from: {data_source}")
+        log(f"Processing data from: {data_source}\n")
         
         # Auto-detect type if not specified
         data_type = args.type
         if data_type == "auto":
             data_type = parser_instance.detect_type(stash_data)
-            if args.verbose:
-                print(f"Auto-detected type: {data_type}")
+            log(f"Auto-detected type: {data_type}\n")
         
         # Convert to NFO format
-        if args.verbose:
-            print(f"Converting {data_type} data to NFO format")
+        log(f"Converting {data_type} data to NFO format\n")
         
         converter = StashToNfoConverter()
         nfo_data = converter.convert(stash_data, data_type)
         
-        # Generate NFO XML
-        if args.verbose:
-            print(f"Generating NFO XML")
-        
-        generator = NfoGenerator(encoding=args.encoding, pretty_print=args.pretty)
-        nfo_xml = generator.generate(nfo_data, data_type)
+        generator = _generator(args.encoding, args.pretty)
         
         # Extract images if requested
         extracted_images = []
         if args.extract_images:
-            if args.verbose:
-                print(f"Extracting base64 encoded images")
+            log(f"Extracting base64 encoded images\n")
             
-            extracted_images = converter.extract_images(stash_data, output_path)
+            extracted_images = converter.extract_images(stash_data, Path(output_path))
             if extracted_images:
-                if args.verbose:
-                    print(f"Extracted {len(extracted_images)} images: {', '.join(extracted_images)}")
-            elif args.verbose:
-                print("No base64 encoded images found to extract")
+                log(f"Extracted {len(extracted_images)} images: {', '.join(extracted_images)}\n")
+            else:
+                log("No base64 encoded images found to extract\n")
         
-        # Write output file
-        if args.verbose:
-            print(f"Writing output file: {output_path}")
+        # Generate NFO XML straight into the output file
+        log(f"Generating NFO XML\n")
+        log(f"Writing output file: {output_path}\n")
         
-        with open(output_path, 'w', encoding=args.encoding) as f:
-            f.write(nfo_xml)
+        output_size = generator.generate_to_file(nfo_data, data_type, output_path)
         
         print(f"Successfully converted '{data_source}' to '{output_path}'")
         
         if extracted_images:
             print(f"Extracted {len(extracted_images)} images: {', '.join(extracted_images)}")
         
-        if args.verbose:
-            print(f"Output file size: {output_path.stat().st_size} bytes")
+        log(f"Output file size: {output_size} bytes\n")
     
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON in input file: {e}", file=sys.stderr)